@@ -105,5 +105,5 @@ def trigger_training_pipeline(
         encryption_spec_key_name=encryption_key,
     )
 
-    job.run(service_account=service_account, sync=False)
-    print("[RETRAIN PIPELINE] Triggered asynchronously.")
+    job.submit(service_account=service_account)
+    print(f"[RETRAIN PIPELINE] Submitted {job.resource_name}")
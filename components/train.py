@@ -8,53 +8,262 @@ for open-source showcasing.
 from kfp.dsl import Dataset, Input, Output, component
 
 
-# === Component 1: split_data_by_time_series ===
-@component(base_image="python:3.10", packages_to_install=["pandas", "scikit-learn", "pyarrow"])
+# === Component 1: materialize_training_data ===
+@component(base_image="python:3.10", packages_to_install=["google-cloud-bigquery"])
+def materialize_training_data(
+    project: str,
+    query: str,
+    staging_dataset: str = "",
+    expiration_hours: int = 72,
+) -> str:
+    """
+    Run the training query and return its result table ID.
+
+    Nothing is downloaded here: downstream steps read only the columns and rows
+    they need from this table via the BigQuery Storage Read API.
+
+    With ``staging_dataset`` set, results go to a fresh table there that expires
+    after ``expiration_hours``. Otherwise the query's anonymous result table is
+    used, which BigQuery keeps for only ~24h (less on a query-cache hit), so
+    long runs with many windows should set a staging dataset.
+    """
+    import uuid
+    from datetime import datetime, timedelta
+
+    from google.cloud import bigquery
+
+    client = bigquery.Client(project=project)
+    job_config = bigquery.QueryJobConfig()
+    if staging_dataset:
+        dataset_ref = bigquery.DatasetReference.from_string(
+            staging_dataset, default_project=project
+        )
+        job_config.destination = dataset_ref.table(f"training_data_{uuid.uuid4().hex}")
+        job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+
+    job = client.query(query, job_config=job_config)
+    job.result()
+
+    dest = job.destination
+    if dest is None:
+        # Scripts and DDL statements produce no result table to read from
+        raise ValueError("Training query did not produce a result table; pass a single SELECT")
+
+    if staging_dataset:
+        table = client.get_table(dest)
+        # Naive UTC on purpose: datetime.UTC needs 3.11 and the base image is 3.10
+        table.expires = datetime.utcnow() + timedelta(hours=expiration_hours)
+        client.update_table(table, ["expires"])
+
+    print(f"[MATERIALIZE] Query results at {dest.project}.{dest.dataset_id}.{dest.table_id}")
+    return f"{dest.project}.{dest.dataset_id}.{dest.table_id}"
+
+
+# === Component 2: inspect_schema_from_bq ===
+@component(base_image="python:3.10", packages_to_install=["google-cloud-bigquery"])
+def inspect_schema_from_bq(
+    project: str,
+    table: str,
+    date_col: str,
+    numeric: Output[Dataset],
+    cat: Output[Dataset],
+    label_col: str = "label",
+    id_col: str = "user_pseudo_id",
+):
+    """
+    Classify feature columns as numeric or categorical from the table's BigQuery schema.
+
+    Only table metadata is fetched — no rows are read.
+    """
+    import json
+
+    from google.cloud import bigquery
+
+    numeric_types = {"INTEGER", "INT64", "FLOAT", "FLOAT64", "NUMERIC", "BIGNUMERIC"}
+    cat_types = {"STRING", "BOOLEAN", "BOOL"}
+    skip = {date_col, label_col, id_col}
+
+    fields = bigquery.Client(project=project).get_table(table).schema
+    numeric_cols = [f.name for f in fields if f.field_type in numeric_types and f.name not in skip]
+    cat_cols = [f.name for f in fields if f.field_type in cat_types and f.name not in skip]
+
+    with open(numeric.path, "w") as f:
+        json.dump(numeric_cols, f)
+    with open(cat.path, "w") as f:
+        json.dump(cat_cols, f)
+
+    print(f"[SCHEMA] {len(numeric_cols)} numeric, {len(cat_cols)} categorical features")
+
+
+# === Component 3: split_data_by_time_series ===
+@component(base_image="python:3.10", packages_to_install=["google-cloud-bigquery"])
 def split_data_by_time_series(
-    input_dataset: Input[Dataset],
+    project: str,
+    table: str,
     date_col: str,
     gap: int,
     prediction_window: int,
-    output_splits_path: Output[Dataset],
-):
+) -> list[dict]:
     """
     Splits time series data into rolling train/test windows with a defined gap.
+
+    Window boundaries are computed in BigQuery over the distinct dates, and the
+    small list of ``{window_index, train_end, test_start, test_end}`` dicts is
+    returned directly for ``dsl.ParallelFor`` — no splits artifact is written.
+    """
+    from google.cloud import bigquery
+
+    sql = f"""
+        WITH dates AS (
+            SELECT DISTINCT DATE({date_col}) AS d
+            FROM `{table}`
+            WHERE {date_col} IS NOT NULL
+        ),
+        ranked AS (
+            SELECT d, ROW_NUMBER() OVER (ORDER BY d) - 1 AS rn
+            FROM dates
+        )
+        SELECT
+            train.rn AS window_index,
+            CAST(train.d AS STRING) AS train_end,
+            CAST(MIN(test.d) AS STRING) AS test_start,
+            CAST(MAX(test.d) AS STRING) AS test_end
+        FROM ranked AS train
+        JOIN ranked AS test
+            ON test.rn BETWEEN train.rn + {gap} AND train.rn + {gap} + {prediction_window} - 1
+        GROUP BY train.rn, train.d
+        HAVING COUNT(*) = {prediction_window}
+        ORDER BY window_index
+    """
+
+    windows = [dict(row) for row in bigquery.Client(project=project).query(sql).result()]
+    print(f"[SPLIT] {len(windows)} windows")
+    return windows
+
+
+# === Component 4: prepare_window ===
+@component(
+    base_image="python:3.10",
+    packages_to_install=[
+        "pandas",
+        "scikit-learn",
+        "imbalanced-learn",
+        "joblib",
+        "pyarrow",
+        "google-cloud-bigquery-storage",
+    ],
+)
+def prepare_window(
+    project: str,
+    table: str,
+    date_col: str,
+    train_end: str,
+    test_start: str,
+    test_end: str,
+    numeric: Input[Dataset],
+    cat: Input[Dataset],
+    X_train_scaled_path: Output[Dataset],
+    y_res_path: Output[Dataset],
+    X_test_scaled_path: Output[Dataset],
+    y_test_path: Output[Dataset],
+    scaler_output_path: Output[Dataset],
+    do_smote: bool = False,
+    undersample_ratio: float = 0.05,
+    smote_ratio: float = 0.1,
+    label_col: str = "label",
+):
     """
-    import pickle
+    Extract, resample, and scale one window in a single step.
 
+    Fuses extract_window_data -> resample_data -> preprocess_data so the
+    intermediate X/y splits never leave the pod; only the final training-ready
+    arrays and the fitted scaler are written out. Rows are streamed from BigQuery
+    with the window's date filter pushed down, so each pod transfers only its slice.
+    """
+    import datetime
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+
+    import joblib
     import pandas as pd
+    from google.cloud.bigquery_storage import BigQueryReadClient, types
+    from imblearn.over_sampling import SMOTE, SMOTENC
+    from imblearn.under_sampling import RandomUnderSampler
+    from sklearn.preprocessing import StandardScaler
 
-    df = pd.read_parquet(input_dataset.path)
-    df[date_col] = pd.to_datetime(df[date_col])
+    with open(numeric.path) as f:
+        numeric_cols = json.load(f)
+    with open(cat.path) as f:
+        cat_cols = json.load(f)
+    feature_cols = numeric_cols + cat_cols
 
-    unique_dates = sorted(df[date_col].unique())
-    splits = []
+    # Extract: stream only this window's rows (train is expanding, so everything up to test_end).
+    # Exclusive next-day bound: `<= test_end` would cut TIMESTAMP rows after midnight on test_end.
+    upper_bound = datetime.date.fromisoformat(test_end) + datetime.timedelta(days=1)
+    table_project, dataset_id, table_id = table.split(".")
+    client = BigQueryReadClient()
+    session = client.create_read_session(
+        parent=f"projects/{project}",
+        read_session=types.ReadSession(
+            table=f"projects/{table_project}/datasets/{dataset_id}/tables/{table_id}",
+            data_format=types.DataFormat.ARROW,
+            read_options=types.ReadSession.TableReadOptions(
+                selected_fields=feature_cols + [label_col, date_col],
+                row_restriction=f"{date_col} < '{upper_bound.isoformat()}'",
+            ),
+        ),
+        max_stream_count=8,
+    )
+    with ThreadPoolExecutor(max_workers=max(len(session.streams), 1)) as pool:
+        frames = list(
+            pool.map(
+                lambda stream: client.read_rows(stream.name).to_dataframe(session),
+                session.streams,
+            )
+        )
+    df = pd.concat(frames, ignore_index=True)
+    dates = pd.to_datetime(df[date_col]).dt.date.astype(str)
 
-    for i in range(len(unique_dates) - gap - prediction_window + 1):
-        train_end = unique_dates[i]
-        test_range = unique_dates[i + gap : i + gap + prediction_window]
-        train_idx = df[df[date_col] <= train_end].index
-        test_idx = df[df[date_col].isin(test_range)].index
-        splits.append((train_idx.tolist(), test_idx.tolist()))
+    train_mask = dates <= train_end
+    test_mask = (dates >= test_start) & (dates <= test_end)
+    X_train, y_train = df.loc[train_mask, feature_cols], df.loc[train_mask, label_col]
+    X_test, y_test = df.loc[test_mask, feature_cols], df.loc[test_mask, label_col]
+    del df
 
-    with open(output_splits_path.path, "wb") as f:
-        pickle.dump(splits, f)
+    # Resample: undersample the majority class, then optionally oversample with SMOTE
+    undersampler = RandomUnderSampler(sampling_strategy=undersample_ratio, random_state=42)
+    X_res, y_res = undersampler.fit_resample(X_train, y_train)
+    if do_smote:
+        smote = (
+            SMOTENC(categorical_features=cat_cols, sampling_strategy=smote_ratio, random_state=42)
+            if cat_cols
+            else SMOTE(sampling_strategy=smote_ratio, random_state=42)
+        )
+        X_res, y_res = smote.fit_resample(X_res, y_res)
 
+    # Preprocess: fit the scaler on resampled train only to avoid test leakage
+    scaler = StandardScaler()
+    X_res[numeric_cols] = scaler.fit_transform(X_res[numeric_cols])
+    X_test[numeric_cols] = scaler.transform(X_test[numeric_cols])
 
-# === Component 2: count_total_windows ===
-@component(base_image="python:3.10", packages_to_install=["pandas"])
-def count_total_windows(splits_path: Input[Dataset]) -> list[int]:
-    """
-    Returns the number of split windows to enable iteration.
-    """
-    import pickle
+    # Downcast before writing: boosters bin features anyway, so float64/int64 only doubles the bytes.
+    # cat_cols are STRING/BOOL (see inspect_schema_from_bq) and left to Parquet dictionary encoding.
+    for X in (X_res, X_test):
+        X[numeric_cols] = X[numeric_cols].astype("float32")
+    y_res = pd.to_numeric(y_res, downcast="integer")
+    y_test = pd.to_numeric(y_test, downcast="integer")
 
-    with open(splits_path.path, "rb") as f:
-        splits = pickle.load(f)
-    return list(range(len(splits)))
+    # Columnar + Snappy keeps pod-to-pod transfers small; pyarrow dictionary-encodes
+    # repeated categorical strings on its own, so they are written as-is
+    parquet_opts = {"engine": "pyarrow", "compression": "snappy", "index": False}
+    X_res.to_parquet(X_train_scaled_path.path, **parquet_opts)
+    y_res.to_frame(label_col).to_parquet(y_res_path.path, **parquet_opts)
+    X_test.to_parquet(X_test_scaled_path.path, **parquet_opts)
+    y_test.to_frame(label_col).to_parquet(y_test_path.path, **parquet_opts)
+    joblib.dump(scaler, scaler_output_path.path)
 
 
-# === Component 3: train_lgb_model ===
+# === Component 5: train_lgb_model ===
 @component(
     base_image="python:3.10",
     packages_to_install=["pandas", "scikit-learn", "lightgbm", "joblib", "pyarrow"],
@@ -76,10 +285,10 @@ def train_lgb_model(
     import pandas as pd
     from lightgbm import LGBMClassifier, early_stopping, log_evaluation
 
-    X_train = pd.read_parquet(X_train_path.path)
-    y_train = pd.read_parquet(y_train_path.path).squeeze()
-    X_valid = pd.read_parquet(X_valid_path.path)
-    y_valid = pd.read_parquet(y_valid_path.path).squeeze()
+    X_train = pd.read_parquet(X_train_path.path, engine="pyarrow")
+    y_train = pd.read_parquet(y_train_path.path, engine="pyarrow").squeeze()
+    X_valid = pd.read_parquet(X_valid_path.path, engine="pyarrow")
+    y_valid = pd.read_parquet(y_valid_path.path, engine="pyarrow").squeeze()
 
     with open(cat.path) as f:
         cat_cols = json.load(f)
@@ -111,14 +320,144 @@ def train_lgb_model(
     joblib.dump(model, model_output_path.path)
 
 
+# === Component 6: evaluate_model_to_file ===
+@component(
+    base_image="python:3.10",
+    packages_to_install=[
+        "pandas",
+        "scikit-learn",
+        "lightgbm",
+        "xgboost",
+        "catboost",
+        "joblib",
+        "pyarrow",
+    ],
+)
+def evaluate_model_to_file(
+    model_path: Input[Dataset],
+    scaler_path: Input[Dataset],
+    X_test_path: Input[Dataset],
+    y_test_path: Input[Dataset],
+    cat: Input[Dataset],
+    k: int,
+    model_type: str,
+    window_index: int,
+    eval_output_path: Output[Dataset],
+):
+    """
+    Score the held-out window and emit PR-AUC, precision/recall@k, and lift as a one-row result.
+    """
+    import json
+    from datetime import datetime
+
+    import joblib
+    import pandas as pd
+    from sklearn.metrics import average_precision_score
+
+    model = joblib.load(model_path.path)
+    X_test = pd.read_parquet(X_test_path.path, engine="pyarrow")
+    y_test = pd.read_parquet(y_test_path.path, engine="pyarrow").squeeze()
+
+    with open(cat.path) as f:
+        cat_cols = json.load(f)
+
+    if model_type == "catboost":
+        for col in cat_cols:
+            X_test[col] = X_test[col].fillna("missing").astype(str)
+    else:
+        for col in cat_cols:
+            X_test[col] = X_test[col].astype("category")
+
+    scores = model.predict_proba(X_test)[:, 1]
+    top_k = pd.Series(scores, index=y_test.index).nlargest(k).index
+    hits = int(y_test.loc[top_k].sum())
+    n_pos = int(y_test.sum())
+    precision = hits / len(top_k) if len(top_k) else 0.0
+    base_rate = n_pos / len(y_test) if len(y_test) else 0.0
+
+    result = {
+        "window_index": window_index,
+        "model_type": model_type,
+        "k": k,
+        "pr_auc": float(average_precision_score(y_test, scores)) if n_pos else 0.0,
+        "precision": precision,
+        "recall": hits / n_pos if n_pos else 0.0,
+        "lift": precision / base_rate if base_rate else 0.0,
+        # Downstream selection copies the winning model/scaler straight from these URIs
+        "model_uri": model_path.uri,
+        "scaler_uri": scaler_path.uri,
+        "eval_date": datetime.today().date(),
+    }
+
+    # Parquet so the merge step can bulk-load every window's row in one BigQuery job
+    pd.DataFrame([result]).to_parquet(
+        eval_output_path.path, engine="pyarrow", compression="snappy", index=False
+    )
+
+
+# === Component 7: ensure_bq_table ===
+@component(base_image="python:3.10", packages_to_install=["google-cloud-bigquery"])
+def ensure_bq_table(project: str, bq_table: str):
+    """
+    Create the evaluation results table once, outside the per-window write path.
+
+    Runs a single time per pipeline and is cacheable: the merge loads use
+    CREATE_IF_NEEDED, so a cache hit after the table was dropped is harmless.
+    Existing tables are left untouched (idempotent).
+    """
+    from google.cloud import bigquery
+
+    schema = [
+        bigquery.SchemaField("window_index", "INT64"),
+        bigquery.SchemaField("model_type", "STRING"),
+        bigquery.SchemaField("k", "INT64"),
+        bigquery.SchemaField("pr_auc", "FLOAT64"),
+        bigquery.SchemaField("precision", "FLOAT64"),
+        bigquery.SchemaField("recall", "FLOAT64"),
+        bigquery.SchemaField("lift", "FLOAT64"),
+        bigquery.SchemaField("model_uri", "STRING"),
+        bigquery.SchemaField("scaler_uri", "STRING"),
+        bigquery.SchemaField("eval_date", "DATE"),
+    ]
+    # bq_table may omit the project (e.g. "dataset.table"), so resolve it like load jobs do
+    table_ref = bigquery.TableReference.from_string(bq_table, default_project=project)
+    bigquery.Client(project=project).create_table(
+        bigquery.Table(table_ref, schema=schema), exists_ok=True
+    )
+    print(f"[ENSURE TABLE] {bq_table} ready")
+
+
+# === Component 8: merge_and_write_to_bq ===
+@component(base_image="python:3.10", packages_to_install=["google-cloud-bigquery"])
+def merge_and_write_to_bq(eval_results: Input[list[Dataset]], project: str, bq_table: str):
+    """
+    Fan-in step: append every per-window evaluation file to BigQuery in a single load job.
+
+    The table is created up front by ensure_bq_table. ALLOW_FIELD_ADDITION lets
+    tables created before newer columns (e.g. model_uri/scaler_uri) keep accepting
+    appends. Rows are never streamed — see docs/decisions.md (Batched BigQuery Loads).
+    """
+    from google.cloud import bigquery
+
+    # Artifacts already live on GCS — load them in place rather than downloading rows
+    uris = [result.uri for result in eval_results]
+
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION],
+    )
+    job = bigquery.Client(project=project).load_table_from_uri(
+        uris, bq_table, job_config=job_config
+    )
+    job.result()
+
+    print(f"[MERGE] {job.output_rows} evaluation rows from {len(uris)} files written to {bq_table}")
+
+
 # === Not included: other components ===
 # The following are part of the original project but excluded for open-source brevity:
-# - extract_window_data
-# - resample_data (undersampling/SMOTE)
-# - preprocess_data (scaling)
 # - train_xgb_model, train_catboost_model
-# - evaluate_model_to_file
-# - merge_and_write_to_bq
 # - summarize_eval_from_bq
 # - export_best_model
 
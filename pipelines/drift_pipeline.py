@@ -9,6 +9,7 @@ What these pipelines showcase:
 Notes:
 - Sanitized for showcase; replace projects, tables, and buckets with your own.
 - Emphasizes modular design: each step is a component; pipelines stitch them into repeatable routines.
+- Steps that read "latest" state or write results have caching disabled so daily runs never reuse stale outputs.
 - Some imported components are NOT included in the published components/ folder.
   They are kept here to show the full pipeline orchestration.
   See components/README.md for descriptions.
@@ -51,6 +52,8 @@ def run_data_drift_analysis_pipeline(
     # Fetch baseline (train) and current (predict) feature data
     train_op = fetch_raw_data(project=bq_project, query=train_query)
     predict_op = fetch_raw_data(project=bq_project, query=predict_query)
+    train_op.set_caching_options(False)
+    predict_op.set_caching_options(False)
 
     # Pull latest exported model & feature lists for alignment
     model_op = load_latest_model_from_gcs(
@@ -65,6 +68,8 @@ def run_data_drift_analysis_pipeline(
         folder_name=model_folder,
         suffix_type="numeric",
     )
+    for latest_op in (model_op, cat_op, num_op):
+        latest_op.set_caching_options(False)
     importance_op = extract_feature_importance_from_model(
         model_file=model_op.outputs["output_model"]
     )
@@ -93,7 +98,7 @@ def run_data_drift_analysis_pipeline(
         data=evaluate_op.outputs["output_result"],
         table_id=table_id,
         write_mode=write_mode,
-    )
+    ).set_caching_options(False)
 
 
 @pipeline(
@@ -110,6 +115,7 @@ def run_concept_drift_analysis_pipeline(
 ):
     # Anchor date is typically "yesterday" in production; simplified here
     anchor_date_op = calculate_anchor_date()
+    anchor_date_op.set_caching_options(False)
 
     perf_op = compute_model_performance_drift(
         predict_date_str=anchor_date_op.output,
@@ -127,6 +133,11 @@ def run_concept_drift_analysis_pipeline(
 
     label_op = compute_label_distribution_drift(project=bq_project, date=anchor_date_op.output)
 
+    # These query BQ tables that change under the same anchor date (late labels, re-scored
+    # predictions); a cache hit would re-emit stale drift metrics — never cache.
+    for concept_op in (perf_op, score_op, label_op):
+        concept_op.set_caching_options(False)
+
     merge_op = merge_and_evaluate_concept_drift(
         model_drift=perf_op.outputs["output"],
         score_drift=score_op.outputs["output"],
@@ -138,7 +149,7 @@ def run_concept_drift_analysis_pipeline(
         data=merge_op.outputs["output_result"],
         table_id=table_id,
         write_mode=write_mode,
-    )
+    ).set_caching_options(False)
 
 
 @pipeline(name="drift-detection-pipeline", description="Combined data + concept drift monitoring")
@@ -35,4 +35,4 @@ def daily_predict_pipeline(
         top_k=top_k,
         daily_predict_query=daily_predict_query,
         prediction_output_table=prediction_output_table,
-    )
+    ).set_caching_options(False)
@@ -9,6 +9,7 @@ What this pipeline showcases:
 Notes:
 - Sanitized and parameterized for showcase; replace table names, buckets, and SQL URI.
 - Demonstrates control-flow with dsl.If and clean hand-off to another pipeline.
+- Every step reads or writes live state, so caching is disabled per task.
 
 Inputs (params):
 - BigQuery: bq_project, drift_log_table, concept_drift_log_table, raw_data_table, output_table
@@ -54,6 +55,7 @@ def daily_drift_check_and_retrain(
         drift_log_table=drift_log_table,
         concept_drift_log_table=concept_drift_log_table,
     )
+    decision.set_caching_options(False)
 
     with dsl.If(decision.output == "RETRAIN"):
         fe = run_feature_engineering_sql(
@@ -62,6 +64,7 @@ def daily_drift_check_and_retrain(
             output_table=output_table,
             feature_sql_gcs_uri=feature_sql_gcs_uri,
         )
+        fe.set_caching_options(False)
 
         trigger_training_pipeline(
             project=bq_project,
@@ -82,4 +85,4 @@ def daily_drift_check_and_retrain(
                 "export_bucket": export_bucket,
             },
             encryption_key=encryption_key,
-        ).after(fe)
+        ).after(fe).set_caching_options(False)
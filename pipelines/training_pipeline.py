@@ -3,13 +3,13 @@ Vertex AI Pipeline — Training (Sliding Windows, Multi-Model)
 
 What this pipeline showcases:
 - Split data into rolling time windows with a leakage-safe gap
-- Train LightGBM / XGBoost / CatBoost **in parallel** per window
+- Train LightGBM / XGBoost / CatBoost **in parallel** per window as sibling tasks
 - Evaluate each model, aggregate metrics to BigQuery, and export the daily best model to GCS
 
 Notes for reviewers:
 - This is a sanitized, showcase-only pipeline. All GCP project IDs, table names,
   and bucket paths must be supplied as pipeline parameters.
-- The pipeline emphasizes orchestration (ParallelFor, If, fan-out/fan-in)
+- The pipeline emphasizes orchestration (ParallelFor, static fan-out, fan-in)
   and production concerns (schema tracking, model versioning).
 - Some imported components are NOT included in the published components/ folder.
   They are listed below for structural completeness — see components/README.md
@@ -18,7 +18,12 @@ Notes for reviewers:
 
 # ── Published components (included in components/train.py) ──────────────
 from components.train import (
-    count_total_windows,
+    ensure_bq_table,
+    evaluate_model_to_file,
+    inspect_schema_from_bq,
+    materialize_training_data,
+    merge_and_write_to_bq,
+    prepare_window,
     split_data_by_time_series,
     train_lgb_model,
 )
@@ -29,163 +34,185 @@ from kfp.dsl import pipeline
 # These imports would resolve in the full production codebase.
 # They are kept here to show the complete pipeline orchestration.
 #
-# from components.utils import fetch_raw_data
 # from components.train import (
-#     inspect_schema,
 #     store_schema_features,
-#     resample_data,
-#     preprocess_data,
-#     extract_window_data,
 #     train_xgb_model,
 #     train_catboost_model,
-#     evaluate_model_to_file,
-#     merge_and_write_to_bq,
 #     summarize_eval_from_bq,
 #     export_best_model,
-#     model_eval_done,
-#     wait_for_all_models,
 # )
 
+# Concurrent window limit for ParallelFor. 0 (the KFP default) means unlimited:
+# every window is scheduled at once. Set a positive value only to throttle
+# fan-out for quota reasons — it queues windows and lengthens wall-clock.
+# ParallelFor only accepts a compile-time int, so this is not a runtime parameter.
+WINDOW_PARALLELISM = 0
 
-@pipeline(
-    name="training-pipeline",
-    description="Train and evaluate multiple models using sliding window cross-validation",
-)
-def training_pipeline(
-    bq_project: str = "",  # GCP project for BigQuery operations
-    fetch_raw_data_query: str = "",  # SQL query to fetch training data
-    date_col: str = "date",
-    gap: int = 3,
-    prediction_window: int = 1,
-    k: int = 40000,
-    bq_table: str = "",  # Destination table for evaluation results
-    selection_metric: str = "recall",
-    gcs_project: str = "",  # GCP project for GCS operations
-    export_bucket: str = "",  # GCS bucket for model artifacts
-):
-    """
-    End-to-end training pipeline with sliding-window cross-validation.
 
-    This pipeline:
-    1. Fetches raw training data from BigQuery
-    2. Inspects schema and persists feature metadata to GCS
-    3. Creates rolling train/test splits with a configurable gap
-    4. For each window, resamples, preprocesses, and trains 3 models in parallel
-    5. Evaluates all models, selects the best, and exports to GCS
+# Model types the pipeline knows how to train. Pass a subset to
+# make_training_pipeline() to compile a spec without the other branches.
+MODEL_TYPES = ("lgb", "xgb", "catboost")
+
 
-    All parameters must be supplied at runtime — there are no hardcoded
-    project IDs, table names, or bucket paths.
+def make_training_pipeline(models=MODEL_TYPES):
     """
-    # Step 1: Fetch raw data
-    raw_data = fetch_raw_data(query=fetch_raw_data_query, project=bq_project)
-    raw_data.set_cpu_limit("2")
-    raw_data.set_memory_limit("32Gi")
-
-    # Step 2: Inspect schema and store to GCS
-    schema = inspect_schema(input_dataset=raw_data.outputs["output_dataset"])
-    store_schema_features(
-        numeric=schema.outputs["numeric"],
-        cat=schema.outputs["cat"],
-        output_bucket=export_bucket,
-        project=gcs_project,
-    )
+    Build the training pipeline specialized to ``models`` at compile time.
 
-    # Step 3: Create sliding window splits
-    splits = split_data_by_time_series(
-        input_dataset=raw_data.outputs["output_dataset"],
-        date_col=date_col,
-        gap=gap,
-        prediction_window=prediction_window,
+    The model list is a Python-level argument, not a pipeline parameter, so
+    disabled models are absent from the compiled DAG rather than skipped at runtime.
+    """
+    models = tuple(models)
+    if not models:
+        raise ValueError("At least one model type is required")
+    if len(set(models)) != len(models):
+        raise ValueError(f"Duplicate model types: {list(models)}")
+    unknown = set(models) - set(MODEL_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown model types: {sorted(unknown)}")
+    # Order-insensitive: any permutation of the full set compiles the default pipeline
+    suffix = "" if set(models) == set(MODEL_TYPES) else "-" + "-".join(models)
+
+    @pipeline(
+        name=f"training-pipeline{suffix}",
+        description="Train and evaluate multiple models using sliding window cross-validation",
     )
-    index_list = count_total_windows(splits_path=splits.outputs["output_splits_path"])
-
-    # Step 4: Loop over each window
-    with dsl.ParallelFor(index_list.output) as window_index:
-        window_data = extract_window_data(
-            input_dataset=raw_data.outputs["output_dataset"],
-            splits_path=splits.outputs["output_splits_path"],
-            window_index=window_index,
-            numeric=schema.outputs["numeric"],
-            cat=schema.outputs["cat"],
+    def training_pipeline(
+        bq_project: str = "",  # GCP project for BigQuery operations
+        fetch_raw_data_query: str = "",  # SQL query to fetch training data
+        staging_dataset: str = "",  # Dataset for the expiring training-data table (optional)
+        date_col: str = "date",
+        gap: int = 3,
+        prediction_window: int = 1,
+        k: int = 40000,
+        bq_table: str = "",  # Destination table for evaluation results
+        selection_metric: str = "recall",
+        gcs_project: str = "",  # GCP project for GCS operations
+        export_bucket: str = "",  # GCS bucket for model artifacts
+    ):
+        """
+        End-to-end training pipeline with sliding-window cross-validation.
+
+        This pipeline:
+        1. Materializes raw training data in BigQuery (no full-dataset download)
+        2. Inspects schema and persists feature metadata to GCS
+        3. Creates rolling train/test splits with a configurable gap
+        4. For each window, prepares (extract/resample/scale) and trains each enabled model in parallel
+        5. Evaluates all models, selects the best, and exports to GCS
+
+        All parameters must be supplied at runtime — there are no hardcoded
+        project IDs, table names, or bucket paths.
+        """
+        # Step 1: Materialize raw data in BigQuery; later steps stream only what they need
+        raw_data = materialize_training_data(
+            project=bq_project, query=fetch_raw_data_query, staging_dataset=staging_dataset
         )
+        # Source data can change between runs with the same query text — never cache.
+        raw_data.set_caching_options(False)
 
-        resampled = resample_data(
-            X_path=window_data.outputs["X_train_path"],
-            y_path=window_data.outputs["y_train_path"],
-            numeric=schema.outputs["numeric"],
-            cat=schema.outputs["cat"],
-            do_smote=False,
-            undersample_ratio=0.05,
-            smote_ratio=0.1,
-        )
+        # Create the evaluation table once; per-model merges below only append rows
+        eval_table = ensure_bq_table(project=bq_project, bq_table=bq_table)
+        # A cache hit is harmless: the merge loads recreate a dropped table (CREATE_IF_NEEDED)
+        eval_table.set_caching_options(True)
 
-        preprocessed = preprocess_data(
-            X_train_path=resampled.outputs["X_res_path"],
-            X_test_path=window_data.outputs["X_test_path"],
+        # Step 2: Inspect schema and store to GCS
+        schema = inspect_schema_from_bq(
+            project=bq_project, table=raw_data.output, date_col=date_col
+        )
+        schema.set_caching_options(True)
+        store_schema_features(
             numeric=schema.outputs["numeric"],
             cat=schema.outputs["cat"],
+            output_bucket=export_bucket,
+            project=gcs_project,
+        ).set_caching_options(False)
+
+        # Step 3: Create sliding window splits — one step, its window dicts drive the loop directly
+        splits = split_data_by_time_series(
+            project=bq_project,
+            table=raw_data.output,
+            date_col=date_col,
+            gap=gap,
+            prediction_window=prediction_window,
         )
-
-        done_signals = []
-
-        # Step 5: Train and evaluate 3 models
-        with dsl.ParallelFor(["lgb", "xgb", "catboost"]) as model_type:
-            with dsl.If(model_type == "lgb"):
-                train = train_lgb_model(
-                    X_train_path=preprocessed.outputs["X_train_scaled_path"],
-                    y_train_path=resampled.outputs["y_res_path"],
-                    X_valid_path=preprocessed.outputs["X_test_scaled_path"],
-                    y_valid_path=window_data.outputs["y_test_path"],
-                    cat=schema.outputs["cat"],
-                )
-            with dsl.If(model_type == "xgb"):
-                train = train_xgb_model(
-                    X_train_path=preprocessed.outputs["X_train_scaled_path"],
-                    y_train_path=resampled.outputs["y_res_path"],
-                    X_valid_path=preprocessed.outputs["X_test_scaled_path"],
-                    y_valid_path=window_data.outputs["y_test_path"],
+        splits.set_caching_options(True)
+
+        # Step 4: Loop over each window
+        trainers = {
+            "lgb": train_lgb_model,
+            "xgb": train_xgb_model,
+            "catboost": train_catboost_model,
+        }
+        evals = {}
+        with dsl.ParallelFor(splits.output, parallelism=WINDOW_PARALLELISM) as window:
+            # Extract -> resample -> preprocess in one pod; intermediates stay on local disk
+            prep = prepare_window(
+                project=bq_project,
+                table=raw_data.output,
+                date_col=date_col,
+                train_end=window.train_end,
+                test_start=window.test_start,
+                test_end=window.test_end,
+                numeric=schema.outputs["numeric"],
+                cat=schema.outputs["cat"],
+                do_smote=False,
+                undersample_ratio=0.05,
+                smote_ratio=0.1,
+            )
+            prep.set_caching_options(True)
+
+            # Step 5: Train and evaluate each enabled model as sibling tasks
+            for model_type in models:
+                train = trainers[model_type](
+                    X_train_path=prep.outputs["X_train_scaled_path"],
+                    y_train_path=prep.outputs["y_res_path"],
+                    X_valid_path=prep.outputs["X_test_scaled_path"],
+                    y_valid_path=prep.outputs["y_test_path"],
                     cat=schema.outputs["cat"],
                 )
-            with dsl.If(model_type == "catboost"):
-                train = train_catboost_model(
-                    X_train_path=preprocessed.outputs["X_train_scaled_path"],
-                    y_train_path=resampled.outputs["y_res_path"],
-                    X_valid_path=preprocessed.outputs["X_test_scaled_path"],
-                    y_valid_path=window_data.outputs["y_test_path"],
+                # Boosters scale with threads; the default node shape throttles them
+                train.set_cpu_limit("16").set_memory_limit("64Gi")
+
+                evaluated = evaluate_model_to_file(
+                    model_path=train.outputs["model_output_path"],
+                    scaler_path=prep.outputs["scaler_output_path"],
+                    X_test_path=prep.outputs["X_test_scaled_path"],
+                    y_test_path=prep.outputs["y_test_path"],
                     cat=schema.outputs["cat"],
+                    k=k,
+                    model_type=model_type,
+                    window_index=window.window_index,
                 )
-
-            eval_model = evaluate_model_to_file(
-                model_path=train.outputs["model_output_path"],
-                scaler_path=preprocessed.outputs["scaler_output_path"],
-                X_test_path=preprocessed.outputs["X_test_scaled_path"],
-                y_test_path=window_data.outputs["y_test_path"],
-                cat=schema.outputs["cat"],
-                k=k,
-                model_type=model_type,
-                window_index=window_index,
-                bucket_name=export_bucket,
-            ).after(train)
-
-            done = model_eval_done(model_type=model_type).after(eval_model)
-            done_signals.append(done)
-
-    # Step 6: Wait until all model evals complete
-    wait = wait_for_all_models()
-    for done in done_signals:
-        wait.after(done)
-
-    # Step 7: Aggregate evaluation results and export best model
-    merged = merge_and_write_to_bq(
-        result_root_path=f"/gcs/{export_bucket}/eval_results", project=bq_project, bq_table=bq_table
-    ).after(wait)
-
-    summarized = summarize_eval_from_bq(project=bq_project, bq_table=bq_table).after(merged)
-
-    export_best_model(
-        project=bq_project,
-        bq_table=bq_table,
-        selection_metric=selection_metric,
-        gcs_project=gcs_project,
-        export_bucket=export_bucket,
-    ).after(summarized)
+                # Feeds the WRITE_APPEND merge: a cache hit would re-append the original
+                # run's rows (and stale eval_date) on a retry — always re-evaluate.
+                evaluated.set_caching_options(False)
+                evals[model_type] = evaluated
+
+        # Step 6: Fan in each model's evaluations across all windows and append to BigQuery
+        merges = []
+        for eval_model in evals.values():
+            merged = merge_and_write_to_bq(
+                eval_results=dsl.Collected(eval_model.outputs["eval_output_path"]),
+                project=bq_project,
+                bq_table=bq_table,
+            ).after(eval_table)
+            merged.set_caching_options(False)
+            merges.append(merged)
+
+        # Step 7: Summarize and export best model
+        # These steps only take constant parameters and write to BQ/GCS, so a cache
+        # hit would silently skip the write — always execute them.
+        summarized = summarize_eval_from_bq(project=bq_project, bq_table=bq_table).after(*merges)
+        summarized.set_caching_options(False)
+
+        export_best_model(
+            project=bq_project,
+            bq_table=bq_table,
+            selection_metric=selection_metric,
+            gcs_project=gcs_project,
+            export_bucket=export_bucket,
+        ).after(summarized).set_caching_options(False)
+
+    return training_pipeline
+
+
+training_pipeline = make_training_pipeline()
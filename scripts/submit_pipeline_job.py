@@ -1,48 +1,93 @@
 """
 Submit a Vertex AI PipelineJob (showcase)
-- Reads compiled JSON/YAML
+- Reads compiled YAML/JSON (gzipped specs are decompressed locally first)
 - Submits a run with parameter values
+- Prints the job resource name (optionally as JSON) and can block until completion
 """
 
 import argparse
+import ast
+import contextlib
+import gzip
+import json
+import os
+import shutil
+import tempfile
 
 from google.cloud import aiplatform
 
 
+def resolve_spec(path):
+    """Vertex only accepts plain YAML/JSON templates, so inflate .gz specs to a temp file."""
+    if not path.endswith(".gz"):
+        return path
+    suffix = os.path.splitext(path.removesuffix(".gz"))[1]
+    with (
+        gzip.open(path, "rb") as src,
+        tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as dst,
+    ):
+        shutil.copyfileobj(src, dst)
+    return dst.name
+
+
+def parse_params(pairs):
+    """Parse k=v pairs, typing values as Python literals (ints, floats, bools, lists) where possible."""
+    params = {}
+    for kv in pairs:
+        k, v = kv.split("=", 1)
+        # Anything that isn't a literal (table names, dates, SQL) stays a string
+        with contextlib.suppress(ValueError, SyntaxError):
+            v = ast.literal_eval(v)
+        params[k] = v
+    return params
+
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--project", required=True)
     p.add_argument("--region", required=True)
     p.add_argument("--staging-bucket", required=True)
     p.add_argument("--service-account", required=True)
-    p.add_argument("--pipeline-spec", required=True)  # artifacts/training-*.json
+    p.add_argument("--pipeline-spec", required=True)  # artifacts/training-*.yaml[.gz]
     p.add_argument("--job-display-name", default="training-pipeline-job")
-    p.add_argument("--enable-caching", action="store_true")
+    # Unset by default: Vertex then honors each task's compile-time caching option.
+    # Passing --enable-caching / --no-enable-caching overrides every task in the run.
+    p.add_argument("--enable-caching", action=argparse.BooleanOptionalAction, default=None)
     p.add_argument("--encryption-key", default="")  # projects/.../cryptoKeys/...
     p.add_argument("--param", action="append", default=[], help="k=v pairs")
+    p.add_argument("--wait", action="store_true", help="block until the run finishes")
+    p.add_argument("--json", action="store_true", help="print resource name and state as JSON")
     args = p.parse_args()
 
-    # parse params k=v
-    params = {}
-    for kv in args.param:
-        k, v = kv.split("=", 1)
-
-        if v.isdigit():
-            v = int(v)
-        params[k] = v
+    params = parse_params(args.param)
 
     aiplatform.init(project=args.project, location=args.region, staging_bucket=args.staging_bucket)
 
-    job = aiplatform.PipelineJob(
-        display_name=args.job_display_name,
-        template_path=args.pipeline_spec,
-        pipeline_root=f"{args.staging_bucket}/pipeline_root",
-        parameter_values=params,
-        enable_caching=args.enable_caching,
-        encryption_spec_key_name=args.encryption_key or None,
-    )
-    job.run(service_account=args.service_account, sync=False)
-    print("[SUBMITTED]", args.job_display_name, "->", args.pipeline_spec)
+    template_path = resolve_spec(args.pipeline_spec)
+    try:
+        job = aiplatform.PipelineJob(
+            display_name=args.job_display_name,
+            template_path=template_path,
+            pipeline_root=f"{args.staging_bucket}/pipeline_root",
+            parameter_values=params,
+            enable_caching=args.enable_caching,
+            encryption_spec_key_name=args.encryption_key or None,
+        )
+    finally:
+        # PipelineJob loads the template in its constructor; the inflated copy is no longer needed
+        if template_path != args.pipeline_spec:
+            os.remove(template_path)
+    # submit() returns once the job resource exists — no background thread to wait on
+    job.submit(service_account=args.service_account)
+
+    if args.wait:
+        job.wait()  # polls the job state from this client (with backoff); raises if the run fails
+
+    if args.json:
+        print(json.dumps({"resource_name": job.resource_name, "state": job.state.name}))
+    else:
+        print("[SUBMITTED]", args.job_display_name, "->", args.pipeline_spec)
+        print("[RESOURCE]", job.resource_name)
 
 
 if __name__ == "__main__":
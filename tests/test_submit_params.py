@@ -0,0 +1,39 @@
+"""
+Tests for the k=v parameter parsing in scripts/submit_pipeline_job.py.
+Values must reach Vertex with their real types, otherwise the pipeline either
+rejects them or silently falls back to its signature defaults.
+"""
+
+from scripts.submit_pipeline_job import parse_params
+
+
+def test_numeric_values_are_typed():
+    params = parse_params(["gap=3", "offset=-2", "undersample_ratio=0.05"])
+    assert params == {"gap": 3, "offset": -2, "undersample_ratio": 0.05}
+    assert isinstance(params["gap"], int)
+
+
+def test_booleans_are_typed():
+    assert parse_params(["do_smote=False", "verbose=True"]) == {
+        "do_smote": False,
+        "verbose": True,
+    }
+
+
+def test_plain_strings_are_left_alone():
+    params = parse_params(["date_col=date", "selection_metric=recall", "bq_table=ds.eval_result"])
+    assert params == {
+        "date_col": "date",
+        "selection_metric": "recall",
+        "bq_table": "ds.eval_result",
+    }
+
+
+def test_dates_and_sql_stay_strings():
+    params = parse_params(["start=2024-01-01", "query=SELECT * FROM `p.d.t` WHERE x = 1"])
+    assert params["start"] == "2024-01-01"
+    assert params["query"] == "SELECT * FROM `p.d.t` WHERE x = 1"
+
+
+def test_value_may_contain_equals_sign():
+    assert parse_params(["filter=a=b"]) == {"filter": "a=b"}
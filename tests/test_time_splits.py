@@ -1,24 +1,44 @@
 """
 Tests for the rolling time-series split logic used in split_data_by_time_series.
-The logic is replicated here from components/train.py since it lives inside a KFP
-component body and cannot be imported directly.
+The component computes windows in BigQuery SQL; the query is mirrored here in pandas
+(rank distinct dates, self-join on the gap offset, keep complete test ranges).
 """
 
 import pandas as pd
 
 
 def generate_splits(df: pd.DataFrame, date_col: str, gap: int, prediction_window: int):
-    unique_dates = sorted(df[date_col].unique())
+    dates = pd.Series(sorted(pd.to_datetime(df[date_col]).dt.date.unique()), dtype=object)
+    ranked = pd.DataFrame({"d": dates, "rn": range(len(dates))})
+
     splits = []
-    for i in range(len(unique_dates) - gap - prediction_window + 1):
-        train_end = unique_dates[i]
-        test_range = unique_dates[i + gap : i + gap + prediction_window]
-        train_idx = df[df[date_col] <= train_end].index.tolist()
-        test_idx = df[df[date_col].isin(test_range)].index.tolist()
-        splits.append((train_idx, test_idx))
+    for train in ranked.itertuples():
+        test = ranked[ranked["rn"].between(train.rn + gap, train.rn + gap + prediction_window - 1)]
+        if len(test) != prediction_window:
+            continue
+        splits.append(
+            {
+                "window_index": train.rn,
+                "train_end": str(train.d),
+                "test_start": str(test["d"].min()),
+                "test_end": str(test["d"].max()),
+            }
+        )
     return splits
 
 
+def select_window(df: pd.DataFrame, date_col: str, split):
+    """Mirror of the row filtering prepare_window applies to each streamed window."""
+    train_end, test_start, test_end = split["train_end"], split["test_start"], split["test_end"]
+    # Storage Read row_restriction: exclusive bound on the day after test_end
+    upper_bound = pd.Timestamp(test_end) + pd.Timedelta(days=1)
+    df = df[pd.to_datetime(df[date_col]) < upper_bound]
+    dates = pd.to_datetime(df[date_col]).dt.date.astype(str)
+    train_idx = df[dates <= train_end].index.tolist()
+    test_idx = df[(dates >= test_start) & (dates <= test_end)].index.tolist()
+    return train_idx, test_idx
+
+
 def _make_df(n_dates: int = 10, rows_per_date: int = 3) -> pd.DataFrame:
     dates = pd.date_range("2024-01-01", periods=n_dates, freq="D")
     rows = [{"date": d, "value": i} for i, d in enumerate(dates) for _ in range(rows_per_date)]
@@ -34,13 +54,15 @@ def test_split_count_matches_formula():
 
 def test_train_and_test_indices_are_disjoint():
     df = _make_df(n_dates=8)
-    for train_idx, test_idx in generate_splits(df, "date", gap=2, prediction_window=1):
+    for split in generate_splits(df, "date", gap=2, prediction_window=1):
+        train_idx, test_idx = select_window(df, "date", split)
         assert set(train_idx).isdisjoint(set(test_idx))
 
 
 def test_gap_enforces_no_leakage():
     df = _make_df(n_dates=8)
-    for train_idx, test_idx in generate_splits(df, "date", gap=2, prediction_window=1):
+    for split in generate_splits(df, "date", gap=2, prediction_window=1):
+        train_idx, test_idx = select_window(df, "date", split)
         train_dates = set(df.loc[train_idx, "date"])
         test_dates = set(df.loc[test_idx, "date"])
         # All test dates must be strictly after all train dates
@@ -58,6 +80,37 @@ def test_prediction_window_greater_than_one():
     splits = generate_splits(df, "date", gap=2, prediction_window=3)
     # expected: 10 - 2 - 3 + 1 = 6
     assert len(splits) == 6
-    for _, test_idx in splits:
+    for split in splits:
+        _, test_idx = select_window(df, "date", split)
         test_dates = df.loc[test_idx, "date"].unique()
         assert len(test_dates) == 3
+
+
+def test_boundaries_select_same_rows_as_index_split():
+    df = _make_df(n_dates=9, rows_per_date=2)
+    unique_dates = sorted(df["date"].unique())
+    for split in generate_splits(df, "date", gap=2, prediction_window=2):
+        i = split["window_index"]
+        test_range = unique_dates[i + 2 : i + 4]
+        expected_train = df[df["date"] <= unique_dates[i]].index.tolist()
+        expected_test = df[df["date"].isin(test_range)].index.tolist()
+        assert select_window(df, "date", split) == (expected_train, expected_test)
+
+
+def test_window_indices_are_contiguous_from_zero():
+    df = _make_df(n_dates=6)
+    splits = generate_splits(df, "date", gap=1, prediction_window=2)
+    assert [s["window_index"] for s in splits] == list(range(len(splits)))
+
+
+def test_timestamp_rows_on_last_test_day_are_kept():
+    # TIMESTAMP column: rows carry a time of day, so a `<= test_end` pushdown would drop them
+    dates = pd.date_range("2024-01-01", periods=6, freq="D")
+    df = pd.DataFrame(
+        [{"ts": d + pd.Timedelta(hours=h), "value": 0} for d in dates for h in (0, 9, 23)]
+    )
+    for split in generate_splits(df, "ts", gap=1, prediction_window=2):
+        _, test_idx = select_window(df, "ts", split)
+        test_days = df.loc[test_idx, "ts"].dt.date.astype(str)
+        assert (test_days == split["test_end"]).sum() == 3
+        assert len(test_idx) == 6